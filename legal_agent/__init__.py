@@ -0,0 +1,3 @@
+"""
+Claude Legal Agent - legal analysis API powered by Claude
+"""
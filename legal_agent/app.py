@@ -0,0 +1,979 @@
+"""
+Claude Legal Agent - FastAPI application
+One app for every deployment; LEGAL_AGENT_BACKEND selects how Claude is reached:
+
+- direct_api: Anthropic API with ANTHROPIC_API_KEY (default)
+- sdk_oauth:  Claude Code SDK with OAuth (Claude Max subscription)
+- fallback:   no model access, endpoints return setup instructions
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import tempfile
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Optional, Dict, Any, AsyncIterator, List, Literal, Tuple
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
+from aiolimiter import AsyncLimiter
+from cachetools import TTLCache
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, REGISTRY, generate_latest, multiprocess
+import orjson
+import uvicorn
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("legal_agent")
+# httpx logs every Anthropic request at INFO - keep that off the hot path
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Opt-in JSON access log (ACCESS_LOG=1): one object per line on stderr, without
+# the basicConfig prefix. Requests only enqueue records; the listener thread,
+# started in the lifespan hook, does the blocking writes off the event loop.
+ACCESS_LOG = os.getenv("ACCESS_LOG", "").lower() in ("1", "true", "yes")
+_access_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_access_log_listener = logging.handlers.QueueListener(_access_log_queue, logging.StreamHandler(sys.stderr))
+access_logger = logging.getLogger("legal_agent.access")
+access_logger.propagate = False
+access_logger.addHandler(logging.handlers.QueueHandler(_access_log_queue))
+
+# Try to import anthropic
+try:
+    import anthropic
+    import httpx
+    ANTHROPIC_AVAILABLE = True
+except ImportError:
+    ANTHROPIC_AVAILABLE = False
+
+# Claude Code SDK import
+try:
+    from claude_code_sdk import AssistantMessage, ClaudeCodeOptions, ClaudeSDKClient, TextBlock
+    CLAUDE_SDK_AVAILABLE = True
+except ImportError:
+    CLAUDE_SDK_AVAILABLE = False
+
+class Backend(str, Enum):
+    DIRECT_API = "direct_api"
+    SDK_OAUTH = "sdk_oauth"
+    FALLBACK = "fallback"
+
+class LegalQueryRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    query: str
+    context: Optional[str] = None
+    max_turns: Optional[int] = 2
+    stream: Optional[bool] = False
+
+class LegalQueryResponse(BaseModel):
+    query_id: str
+    status: str
+    response: str
+    processing_time: float
+    timestamp: str
+
+LegalTask = Literal["review", "risk", "compliance"]
+
+class LegalMultiRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    query: str
+    context: Optional[str] = None
+    tasks: List[LegalTask] = Field(default_factory=lambda: ["review", "risk", "compliance"], min_length=1)
+
+class LegalMultiResponse(BaseModel):
+    query_id: str
+    status: str
+    results: Dict[str, str]
+    processing_time: float
+    timestamp: str
+
+LegalBatchEndpoint = Literal["health", "query", "contract-review", "risk-assessment"]
+
+# Upper bound on items per /legal/batch request
+BATCH_MAX_ITEMS = 20
+
+class LegalBatchItem(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    endpoint: LegalBatchEndpoint
+    query: Optional[str] = None
+    context: Optional[str] = None
+    max_turns: Optional[int] = None
+
+class LegalBatchRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    items: List[LegalBatchItem] = Field(min_length=1, max_length=BATCH_MAX_ITEMS)
+
+class LegalBatchResponse(BaseModel):
+    results: List[Dict[str, Any]]
+
+CLAUDE_MODEL = "claude-3-5-sonnet-20241022"
+MAX_TOKENS = 4000
+# /legal/multi packs several analyses into one JSON reply - the model's full output limit
+MULTI_MAX_TOKENS = 8192
+
+# Exact-match cache of Claude responses, keyed on model + prompts
+RESPONSE_CACHE_SIZE = 4096
+RESPONSE_CACHE_TTL = 3600
+
+SYSTEM_PROMPT = """You are a specialized legal analysis AI assistant with expertise in contract law, regulatory compliance, and risk assessment. 
+
+Provide detailed, accurate legal analysis while always noting that your responses are for informational purposes only and do not constitute legal advice. Always recommend consulting with a qualified attorney for specific legal matters.
+
+Focus on:
+- Contract clause analysis and interpretation
+- Legal risk assessment and mitigation strategies
+- Regulatory compliance guidance
+- Legal terminology explanations
+- Industry best practices and recommendations
+- Relevant legal precedents and principles
+
+Be thorough, professional, and cite relevant legal principles when applicable. Structure your responses clearly with headings and bullet points where appropriate."""
+
+USER_MESSAGE_SUFFIX = "\n\nPlease provide a comprehensive legal analysis addressing the specific query above."
+
+# Instructions for each analysis /legal/multi can produce in a single Claude call
+MULTI_TASK_INSTRUCTIONS = {
+    "review": "Contract review - identify key legal issues, risks, and recommendations",
+    "risk": "Legal risk assessment - identify potential liabilities, compliance issues, and mitigation strategies",
+    "compliance": "Regulatory compliance - identify applicable regulations, compliance gaps, and required actions",
+}
+
+# Fixed instructions for the specialised endpoints. They are sent as their own
+# content block ahead of the user's text so Anthropic can cache the prefix.
+CONTRACT_REVIEW_PREAMBLE = """**CONTRACT REVIEW AND ANALYSIS**
+
+Review the contract language in the request that follows. Identify key legal issues, risks, and recommendations, covering:
+- Parties, obligations, and key commercial terms
+- Indemnification, liability caps, and limitation of liability clauses
+- Warranties, representations, and remedies
+- Termination, renewal, and dispute resolution provisions
+- Ambiguous, one-sided, or missing provisions
+- Recommended revisions and negotiation points
+
+"""
+
+RISK_ASSESSMENT_PREAMBLE = """**LEGAL RISK ASSESSMENT**
+
+Perform a comprehensive legal risk evaluation of the request that follows. Identify potential liabilities, compliance issues, and mitigation strategies, covering:
+- Contractual and financial exposure
+- Regulatory and compliance risk
+- Litigation and dispute risk
+- Likelihood and severity of each risk
+- Practical mitigation strategies and next steps
+
+"""
+
+# Fallback response, filled in with .format(query=..., context_block=...)
+_SETUP_TEMPLATE = """🏛️ **Claude Legal Agent Setup Required**
+
+Your legal analysis API is deployed and running, but requires authentication configuration.
+
+**To enable full Claude Max legal analysis:**
+1. Go to your Render dashboard
+2. Add environment variable: `ANTHROPIC_API_KEY`
+3. Set the value to your Anthropic API key
+
+**Your Query:** {query}
+{context_block}
+
+**What this API will provide once configured:**
+- Professional legal analysis powered by Claude
+- Contract clause review and risk assessment  
+- Regulatory compliance guidance
+- Legal terminology explanations
+- Best practices recommendations
+
+**Note:** All responses are for informational purposes only and do not constitute legal advice. Always consult with a qualified attorney for specific legal matters.
+
+🔗 Get your API key: https://console.anthropic.com/"""
+
+# Keep proxies (nginx, Cloudflare, Render) from buffering or dropping Server-Sent Events
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Connection": "keep-alive"}
+SSE_HEARTBEAT_INTERVAL = 15
+
+def parse_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """Leniently pull a JSON object out of a model reply (code fences, preambles)"""
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end < start:
+        return None
+    try:
+        parsed = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+def sse_event(payload: Dict[str, Any]) -> str:
+    """Frame a payload as a single Server-Sent Event"""
+    return f"data: {json.dumps(payload)}\n\n"
+
+async def with_heartbeat(events, interval: float = SSE_HEARTBEAT_INTERVAL):
+    """Interleave SSE comment pings while the wrapped stream is idle"""
+    events = events.__aiter__()
+    next_event = asyncio.ensure_future(events.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({next_event}, timeout=interval)
+            if not done:
+                yield ": ping\n\n"
+                continue
+            try:
+                event = next_event.result()
+            except StopAsyncIteration:
+                return
+            yield event
+            next_event = asyncio.ensure_future(events.__anext__())
+    finally:
+        next_event.cancel()
+
+# Stream batching - the first delta ships immediately, later batches grow
+# towards STREAM_MAX_BATCH_SIZE characters or STREAM_FLUSH_INTERVAL seconds
+STREAM_MIN_BATCH_SIZE = 1
+STREAM_MAX_BATCH_SIZE = 64
+STREAM_BATCH_SIZE_GROWTH_FACTOR = 2.0
+STREAM_FLUSH_INTERVAL = 0.03
+
+async def coalesce_deltas(
+    deltas: AsyncIterator[str],
+    min_batch_size: int = STREAM_MIN_BATCH_SIZE,
+    max_batch_size: int = STREAM_MAX_BATCH_SIZE,
+    batch_size_growth_factor: float = STREAM_BATCH_SIZE_GROWTH_FACTOR,
+    flush_interval: float = STREAM_FLUSH_INTERVAL,
+) -> AsyncIterator[str]:
+    """Coalesce small text deltas into fewer, larger chunks"""
+    buf = []
+    buffered = 0
+    batch_size = min_batch_size
+    last_flush = time.monotonic()
+
+    async for text in deltas:
+        buf.append(text)
+        buffered += len(text)
+        now = time.monotonic()
+        if buffered >= batch_size or now - last_flush >= flush_interval:
+            yield "".join(buf)
+            buf.clear()
+            buffered = 0
+            last_flush = now
+            batch_size = min(max_batch_size, batch_size * batch_size_growth_factor)
+
+    if buf:
+        yield "".join(buf)
+
+# uvicorn worker processes main() starts. Fixed rather than os.cpu_count(), which
+# in a container reports the host's cores, not the CPU quota.
+DEFAULT_WORKERS = 2
+# Processes sharing the limits below - main() exports it to its workers; unset means
+# this process serves alone (e.g. `uvicorn legal_agent.app:app` or TestClient)
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+# Bound concurrent Claude calls and smooth bursts under Anthropic's rate limits.
+# Both limits are for the whole service, so each worker gets an equal share.
+ANTHROPIC_MAX_CONCURRENCY = int(os.getenv("ANTHROPIC_MAX_CONCURRENCY", "8"))
+ANTHROPIC_REQUESTS_PER_MINUTE = int(os.getenv("ANTHROPIC_REQUESTS_PER_MINUTE", "50"))
+RATE_LIMIT_RETRIES = 3
+
+_sem = asyncio.Semaphore(max(1, ANTHROPIC_MAX_CONCURRENCY // WEB_CONCURRENCY))
+_rate_limiter = AsyncLimiter(ANTHROPIC_REQUESTS_PER_MINUTE / WEB_CONCURRENCY, 60)
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Honour Retry-After when Anthropic sends it, else exponential backoff with jitter"""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(60.0, float(retry_after))
+    except (TypeError, ValueError):
+        return min(60.0, 2 ** attempt + random.random())
+
+async def create_message_with_backoff(client, **kwargs):
+    """Call messages.create inside the concurrency and rate limits, retrying 429s,
+    overloaded/5xx responses and dropped connections.
+
+    The client is built with max_retries=0, so every attempt goes through the limits.
+    """
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        try:
+            async with _sem, _rate_limiter:
+                return await client.messages.create(**kwargs)
+        except (anthropic.RateLimitError, anthropic.InternalServerError, anthropic.APIConnectionError) as e:
+            if attempt == RATE_LIMIT_RETRIES:
+                raise
+            await asyncio.sleep(_retry_delay(e, attempt))
+
+LEGAL_QUERIES = Counter(
+    "legal_queries_total",
+    "Legal analysis queries handled",
+    ["endpoint", "status"]
+)
+
+def claude_http_error(error: Exception) -> HTTPException:
+    """Map a failed Claude call to an HTTP error clients can act on"""
+    if ANTHROPIC_AVAILABLE:
+        if isinstance(error, anthropic.RateLimitError):
+            return HTTPException(
+                status_code=429,
+                detail="Claude rate limit reached - please retry later",
+                headers={"Retry-After": error.response.headers.get("retry-after", "5")}
+            )
+        if isinstance(error, (anthropic.APITimeoutError, httpx.TimeoutException)):
+            return HTTPException(status_code=504, detail="Claude request timed out")
+        if isinstance(error, anthropic.AuthenticationError):
+            return HTTPException(status_code=401, detail="Anthropic rejected ANTHROPIC_API_KEY")
+        if isinstance(error, anthropic.APIStatusError):
+            return HTTPException(status_code=error.status_code, detail=f"Claude API error: {error.message}")
+        if isinstance(error, anthropic.APIConnectionError):
+            return HTTPException(status_code=502, detail="Could not reach Anthropic")
+    return HTTPException(status_code=500, detail=f"Legal analysis failed: {str(error)}")
+
+class BaseLegalAgent(ABC):
+    """Query handling shared by every backend - subclasses only talk to the model"""
+
+    backend: Backend
+    # Identifies the model in cache keys
+    model_name: str
+    # Whether max_turns changes the model's answer (and so belongs in the cache key)
+    uses_max_turns = False
+
+    def __init__(self):
+        self.query_count = 0
+        self._counter = itertools.count(1)
+        self.available = False
+
+        self._cache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+        # Single-flight registry: concurrent identical queries share one Claude call
+        self._inflight: Dict[bytes, asyncio.Future] = {}
+
+    @property
+    def setup_hint(self) -> str:
+        """What to configure to make this backend available"""
+        return "Set ANTHROPIC_API_KEY environment variable"
+
+    def setup_response(self, query: str, context: Optional[str]) -> str:
+        """Body returned instead of an analysis while the backend is unavailable"""
+        context_block = f"**Context:** {context}" if context else ""
+        return _SETUP_TEMPLATE.format(query=query, context_block=context_block)
+
+    async def connect(self):
+        """Open per-worker resources; called from the lifespan startup hook"""
+
+    async def aclose(self):
+        """Release per-worker resources; called from the lifespan shutdown hook"""
+
+    @abstractmethod
+    async def _call_model(
+        self, prompt: str, system: str, max_turns: int, preamble: Optional[str] = None, max_tokens: int = MAX_TOKENS
+    ) -> str:
+        """Return the model's full reply to preamble + prompt"""
+
+    async def _stream_model(
+        self, prompt: str, system: str, max_turns: int, preamble: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Yield the model's reply as text deltas"""
+        yield await self._call_model(prompt, system, max_turns, preamble)
+
+    @staticmethod
+    def _build_user_message(request: LegalQueryRequest) -> str:
+        """Build the user message sent to Claude"""
+        parts = ["**Legal Analysis Request:** ", request.query]
+        if request.context:
+            parts += ["\n\n**Context:** ", request.context]
+        parts.append(USER_MESSAGE_SUFFIX)
+        return "".join(parts)
+
+    def _cache_key(self, user_message: str, max_turns: int, preamble: Optional[str] = None) -> bytes:
+        """Hash everything that determines Claude's answer"""
+        fields = [self.model_name, SYSTEM_PROMPT, preamble or "", user_message]
+        if self.uses_max_turns:
+            fields.append(str(max_turns))
+        return hashlib.blake2b("\0".join(fields).encode(), digest_size=16).digest()
+
+    async def _complete(
+        self, user_message: str, max_turns: int, preamble: Optional[str] = None, max_tokens: int = MAX_TOKENS
+    ) -> Tuple[str, bool]:
+        """Return Claude's analysis and whether it was served from the cache"""
+        key = self._cache_key(user_message, max_turns, preamble)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached, True
+
+        while (inflight := self._inflight.get(key)) is not None:
+            try:
+                # shield() so one waiter disconnecting doesn't cancel the shared call.
+                # Not "cached" - the waiter sat through the full Claude call.
+                return await asyncio.shield(inflight), False
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # Only the leading request was cancelled - take over the call
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response_content = await self._call_model(user_message, SYSTEM_PROMPT, max_turns, preamble, max_tokens)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved - with no waiters asyncio would log it as unhandled
+            future.exception()
+            raise
+        else:
+            self._cache[key] = response_content
+            future.set_result(response_content)
+            return response_content, False
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _count_query(self, endpoint: str, status: str):
+        """Record a handled query for /health and /metrics"""
+        self.query_count = next(self._counter)
+        LEGAL_QUERIES.labels(endpoint=endpoint, status=status).inc()
+
+    async def process_legal_query(
+        self, request: LegalQueryRequest, endpoint: str = "query", preamble: Optional[str] = None
+    ) -> LegalQueryResponse:
+        """Process legal analysis using Claude"""
+        start_time = time.perf_counter()
+        query_id = str(uuid.uuid4())
+        status = "completed"
+
+        if not self.available:
+            # Return informative response about setup
+            response_content = self.setup_response(request.query, request.context)
+            outcome = "unconfigured"
+
+        else:
+            try:
+                response_content, cached = await self._complete(
+                    self._build_user_message(request), request.max_turns or 2, preamble
+                )
+                if cached:
+                    status = "cached"
+                outcome = status
+
+            except Exception as e:
+                self._count_query(endpoint, "error")
+                raise claude_http_error(e) from e
+
+        # Calculate processing time
+        processing_time = time.perf_counter() - start_time
+
+        self._count_query(endpoint, outcome)
+
+        return LegalQueryResponse(
+            query_id=query_id,
+            status=status,
+            response=response_content,
+            processing_time=processing_time,
+            timestamp=datetime.now(timezone.utc).isoformat()
+        )
+
+    @staticmethod
+    def _build_multi_message(request: LegalMultiRequest, tasks: List[str]) -> str:
+        """Build one user message asking Claude for every requested analysis as JSON"""
+        parts = ["**Legal Analysis Request:** ", request.query]
+        if request.context:
+            parts += ["\n\n**Context:** ", request.context]
+        parts.append("\n\nProvide each of the following analyses of the request above:\n")
+        for task in tasks:
+            parts += ["- ", task, ": ", MULTI_TASK_INSTRUCTIONS[task], "\n"]
+        parts += [
+            "\nRespond with only a JSON object whose keys are ",
+            ", ".join(tasks),
+            " and whose values are the markdown analysis for that key."
+        ]
+        return "".join(parts)
+
+    async def process_multi_query(self, request: LegalMultiRequest) -> LegalMultiResponse:
+        """Run several analyses of the same text in a single Claude call"""
+        start_time = time.perf_counter()
+        query_id = str(uuid.uuid4())
+        status = "completed"
+        tasks = list(dict.fromkeys(request.tasks))
+
+        if not self.available:
+            fallback = self.setup_response(request.query, request.context)
+            results = {task: fallback for task in tasks}
+            outcome = "unconfigured"
+
+        else:
+            try:
+                user_message = self._build_multi_message(request, tasks)
+                response_content, cached = await self._complete(user_message, 1, max_tokens=MULTI_MAX_TOKENS)
+                if cached:
+                    status = "cached"
+                outcome = status
+
+                parsed = parse_json_object(response_content) or {}
+                results = {
+                    task: value if isinstance(value, str) else json.dumps(value)
+                    for task, value in parsed.items() if task in tasks
+                }
+                if not results:
+                    # Claude ignored the JSON instruction or was cut off - hand back the raw
+                    # analysis, but don't serve it from the cache
+                    self._cache.pop(self._cache_key(user_message, 1), None)
+                    results = {"raw": response_content}
+
+            except Exception as e:
+                self._count_query("multi", "error")
+                raise claude_http_error(e) from e
+
+        processing_time = time.perf_counter() - start_time
+
+        self._count_query("multi", outcome)
+
+        return LegalMultiResponse(
+            query_id=query_id,
+            status=status,
+            results=results,
+            processing_time=processing_time,
+            timestamp=datetime.now(timezone.utc).isoformat()
+        )
+
+    def stream_legal_query(
+        self,
+        request: LegalQueryRequest,
+        endpoint: str = "query",
+        preamble: Optional[str] = None,
+        text_field: str = "delta"
+    ) -> StreamingResponse:
+        """Stream legal analysis from Claude as Server-Sent Events, text under text_field"""
+        query_id = str(uuid.uuid4())
+        # Built before streaming starts, so a backend that errors instead still sends a status code
+        setup = None if self.available else self.setup_response(request.query, request.context)
+
+        async def sse_gen():
+            if setup is not None:
+                # Nothing to stream - send the setup instructions in one event
+                self._count_query(endpoint, "unconfigured")
+                yield sse_event({text_field: setup})
+                yield sse_event({"status": "completed", "query_id": query_id})
+                return
+
+            user_message = self._build_user_message(request)
+            max_turns = request.max_turns or 2
+            key = self._cache_key(user_message, max_turns, preamble)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._count_query(endpoint, "cached")
+                yield sse_event({text_field: cached})
+                yield sse_event({"status": "cached", "query_id": query_id})
+                return
+
+            try:
+                parts = []
+                async for text in coalesce_deltas(
+                    self._stream_model(user_message, SYSTEM_PROMPT, max_turns, preamble)
+                ):
+                    parts.append(text)
+                    yield sse_event({text_field: text})
+
+                self._cache[key] = "".join(parts)
+                self._count_query(endpoint, "completed")
+                yield sse_event({"status": "completed", "query_id": query_id})
+
+            except Exception as e:
+                # Headers are already sent, so the status travels in the event
+                self._count_query(endpoint, "error")
+                error = claude_http_error(e)
+                yield sse_event({"error": error.detail, "status_code": error.status_code, "query_id": query_id})
+
+        return StreamingResponse(with_heartbeat(sse_gen()), media_type="text/event-stream", headers=SSE_HEADERS)
+
+class AnthropicDirectAgent(BaseLegalAgent):
+    """Claude through the Anthropic API, authenticated with ANTHROPIC_API_KEY"""
+
+    backend = Backend.DIRECT_API
+    model_name = CLAUDE_MODEL
+
+    def __init__(self):
+        super().__init__()
+        # The client is created per worker process in connect()
+        self.client = None
+        self.available = bool(os.getenv('ANTHROPIC_API_KEY')) and ANTHROPIC_AVAILABLE
+
+    async def connect(self):
+        """Open this worker's Anthropic client and connection pool"""
+        if self.available and self.client is None:
+            self.client = anthropic.AsyncAnthropic(
+                api_key=os.getenv('ANTHROPIC_API_KEY'),
+                # create_message_with_backoff is the only retry layer - SDK retries would
+                # multiply upstream calls and bypass _sem/_rate_limiter
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=200, max_keepalive_connections=100, keepalive_expiry=30),
+                    timeout=httpx.Timeout(600.0, connect=5.0),
+                    http2=True
+                )
+            )
+
+    async def aclose(self):
+        """Close the Anthropic client and its connection pool"""
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    @staticmethod
+    def _system_blocks(system: str) -> List[Dict[str, Any]]:
+        """System prompt as a content block marked for Anthropic prompt caching"""
+        return [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+
+    @staticmethod
+    def _user_content(prompt: str, preamble: Optional[str]):
+        """User message content, with a fixed preamble cached as its own leading block"""
+        if not preamble:
+            return prompt
+        return [
+            {"type": "text", "text": preamble, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": prompt}
+        ]
+
+    async def _call_model(
+        self, prompt: str, system: str, max_turns: int, preamble: Optional[str] = None, max_tokens: int = MAX_TOKENS
+    ) -> str:
+        message = await create_message_with_backoff(
+            self.client,
+            model=CLAUDE_MODEL,
+            max_tokens=max_tokens,
+            system=self._system_blocks(system),
+            messages=[
+                {
+                    "role": "user",
+                    "content": self._user_content(prompt, preamble)
+                }
+            ]
+        )
+        if message.stop_reason == "max_tokens":
+            logger.warning("Claude reply truncated at max_tokens=%d", max_tokens)
+        return message.content[0].text
+
+    async def _stream_model(
+        self, prompt: str, system: str, max_turns: int, preamble: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        async with _sem, _rate_limiter, self.client.messages.stream(
+            model=CLAUDE_MODEL,
+            max_tokens=MAX_TOKENS,
+            system=self._system_blocks(system),
+            messages=[
+                {
+                    "role": "user",
+                    "content": self._user_content(prompt, preamble)
+                }
+            ]
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+class ClaudeSDKAgent(BaseLegalAgent):
+    """Claude through the Claude Code SDK, authenticated with OAuth (Claude Max)"""
+
+    backend = Backend.SDK_OAUTH
+    model_name = "claude-code-sdk"
+    uses_max_turns = True
+
+    def __init__(self):
+        super().__init__()
+        self.available = CLAUDE_SDK_AVAILABLE
+
+    @property
+    def setup_hint(self) -> str:
+        return "Install claude-code-sdk and set CLAUDE_CODE_USE_OAUTH=true"
+
+    def setup_response(self, query: str, context: Optional[str]) -> str:
+        # The API-key setup instructions don't apply to this backend
+        raise HTTPException(
+            status_code=500,
+            detail="Claude Code SDK not available. Please install claude-code-sdk package."
+        )
+
+    async def _call_model(
+        self, prompt: str, system: str, max_turns: int, preamble: Optional[str] = None, max_tokens: int = MAX_TOKENS
+    ) -> str:
+        return "".join([text async for text in self._stream_model(prompt, system, max_turns, preamble)])
+
+    async def _stream_model(
+        self, prompt: str, system: str, max_turns: int, preamble: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        options = ClaudeCodeOptions(
+            permission_mode="bypassPermissions",  # Enables OAuth authentication
+            system_prompt=system,
+            max_turns=max_turns
+        )
+        async with ClaudeSDKClient(options=options) as client:
+            await client.query((preamble or "") + prompt)
+            async for message in client.receive_response():
+                if isinstance(message, AssistantMessage):
+                    for block in message.content:
+                        if isinstance(block, TextBlock):
+                            yield block.text
+
+class FallbackAgent(BaseLegalAgent):
+    """No model access - every endpoint answers with setup instructions"""
+
+    backend = Backend.FALLBACK
+    model_name = "fallback"
+
+    async def _call_model(
+        self, prompt: str, system: str, max_turns: int, preamble: Optional[str] = None, max_tokens: int = MAX_TOKENS
+    ) -> str:
+        raise RuntimeError("No model backend configured")
+
+def create_agent(backend: Backend) -> BaseLegalAgent:
+    """Build the agent for a backend"""
+    agents = {
+        Backend.DIRECT_API: AnthropicDirectAgent,
+        Backend.SDK_OAUTH: ClaudeSDKAgent,
+        Backend.FALLBACK: FallbackAgent,
+    }
+    return agents[backend]()
+
+class AccessLogMiddleware:
+    """ASGI middleware emitting one JSON access-log line per HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            access_logger.info(orjson.dumps({
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": round((time.perf_counter() - start_time) * 1000, 1)
+            }).decode())
+
+# CORS - list explicit origins in ALLOWED_ORIGINS (comma-separated)
+# so browsers can cache preflights for a day
+ALLOWED_ORIGINS = [origin.strip() for origin in os.getenv("ALLOWED_ORIGINS", "*").split(",") if origin.strip()]
+
+def make_app(agent: BaseLegalAgent) -> FastAPI:
+    """Build the FastAPI app serving legal analysis through agent"""
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Startup
+        if ACCESS_LOG:
+            _access_log_listener.start()
+        await agent.connect()
+        logger.info(
+            "starting backend=%s anthropic_available=%s sdk_available=%s agent_available=%s",
+            agent.backend.value, ANTHROPIC_AVAILABLE, CLAUDE_SDK_AVAILABLE, agent.available
+        )
+        yield
+        # Shutdown
+        await agent.aclose()
+        logger.info("shutting down")
+        if ACCESS_LOG:
+            _access_log_listener.stop()
+
+    app = FastAPI(
+        title="Claude Legal Agent API",
+        description="Professional legal analysis powered by Claude - Production Ready",
+        version="3.0.0",
+        lifespan=lifespan
+    )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=ALLOWED_ORIGINS,
+        allow_credentials=ALLOWED_ORIGINS != ["*"],
+        allow_methods=["GET", "POST"],
+        allow_headers=["Authorization", "Content-Type"],
+        max_age=86400,
+    )
+
+    if ACCESS_LOG:
+        app.add_middleware(AccessLogMiddleware)
+
+    @app.get("/health")
+    async def health_check():
+        """Health check endpoint"""
+        return {
+            "status": "healthy",
+            "backend": agent.backend.value,
+            "anthropic_available": ANTHROPIC_AVAILABLE,
+            "claude_sdk_available": CLAUDE_SDK_AVAILABLE,
+            "claude_configured": agent.available,
+            "api_key_set": bool(os.getenv('ANTHROPIC_API_KEY')),
+            "queries_processed": agent.query_count,
+            "timestamp": datetime.now().isoformat(),
+            "setup_required": agent.setup_hint if not agent.available else "Ready for legal analysis"
+        }
+
+    @app.post("/legal/query", response_model=LegalQueryResponse)
+    async def process_legal_query(request: LegalQueryRequest):
+        """Process general legal analysis query"""
+        if request.stream:
+            return agent.stream_legal_query(request)
+        return await agent.process_legal_query(request)
+
+    @app.post("/legal/contract-review", response_model=LegalQueryResponse)
+    async def contract_review(request: LegalQueryRequest):
+        """Specialized contract review endpoint"""
+        enhanced_request = request.model_copy(update={"max_turns": request.max_turns or 3})
+        if enhanced_request.stream:
+            return agent.stream_legal_query(enhanced_request, "contract-review", CONTRACT_REVIEW_PREAMBLE)
+        return await agent.process_legal_query(enhanced_request, "contract-review", CONTRACT_REVIEW_PREAMBLE)
+
+    @app.post("/legal/risk-assessment", response_model=LegalQueryResponse)
+    async def risk_assessment(request: LegalQueryRequest):
+        """Legal risk assessment endpoint"""
+        enhanced_request = request.model_copy(update={"max_turns": request.max_turns or 2})
+        if enhanced_request.stream:
+            return agent.stream_legal_query(enhanced_request, "risk-assessment", RISK_ASSESSMENT_PREAMBLE)
+        return await agent.process_legal_query(enhanced_request, "risk-assessment", RISK_ASSESSMENT_PREAMBLE)
+
+    @app.post("/legal/multi", response_model=LegalMultiResponse)
+    async def multi_analysis(request: LegalMultiRequest):
+        """Contract review, risk and compliance analyses of one text in a single Claude call"""
+        return await agent.process_multi_query(request)
+
+    async def run_batch_item(item: LegalBatchItem) -> Dict[str, Any]:
+        """Dispatch one /legal/batch item to its endpoint handler"""
+        if item.endpoint == "health":
+            return await health_check()
+        if item.query is None:
+            raise HTTPException(status_code=422, detail=f"{item.endpoint} requires a query")
+        request = LegalQueryRequest(query=item.query, context=item.context, max_turns=item.max_turns)
+        handler = {
+            "query": process_legal_query,
+            "contract-review": contract_review,
+            "risk-assessment": risk_assessment,
+        }[item.endpoint]
+        return (await handler(request)).model_dump()
+
+    @app.post("/legal/batch", response_model=LegalBatchResponse)
+    async def batch_analysis(request: LegalBatchRequest):
+        """Run several endpoint calls concurrently in one HTTP round-trip"""
+        outcomes = await asyncio.gather(*map(run_batch_item, request.items), return_exceptions=True)
+        results = []
+        for outcome in outcomes:
+            if isinstance(outcome, HTTPException):
+                # Failures are per item, so the rest of the batch still returns
+                results.append({"status_code": outcome.status_code, "detail": outcome.detail})
+            elif isinstance(outcome, Exception):
+                results.append({"status_code": 500, "detail": f"Legal analysis failed: {str(outcome)}"})
+            else:
+                results.append(outcome)
+        return LegalBatchResponse(results=results)
+
+    @app.post("/legal/stream")
+    async def stream_legal_analysis(request: LegalQueryRequest):
+        """Streaming legal analysis with Server-Sent Events"""
+        # Keeps the {"content": ...} events this endpoint has always sent
+        return agent.stream_legal_query(request, "stream", text_field="content")
+
+    @app.get("/metrics")
+    async def metrics():
+        """Prometheus metrics endpoint"""
+        registry = REGISTRY
+        if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            # Aggregate every worker's counters, not just the one answering the scrape
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+    @app.get("/")
+    async def root():
+        """API root endpoint with setup instructions"""
+        return {
+            "message": "🏛️ Claude Legal Agent API v3.0",
+            "status": "running",
+            "backend": agent.backend.value,
+            "claude_available": agent.available,
+            "endpoints": {
+                "health": "/health",
+                "legal_query": "/legal/query",
+                "contract_review": "/legal/contract-review",
+                "risk_assessment": "/legal/risk-assessment",
+                "multi_analysis": "/legal/multi",
+                "batch": "/legal/batch",
+                "streaming": "/legal/stream",
+                "metrics": "/metrics",
+                "api_docs": "/docs"
+            },
+            "setup_instructions": {
+                "step_1": agent.setup_hint,
+                "step_2": "Get API key from https://console.anthropic.com/",
+                "step_3": "Redeploy service after adding the key",
+                "note": "API will work immediately after configuration"
+            } if not agent.available else {
+                "status": "✅ Ready for professional legal analysis",
+                "note": "All endpoints are fully functional"
+            }
+        }
+
+    return app
+
+# Initialize legal agent and app for the configured backend
+legal_agent = create_agent(Backend(os.getenv("LEGAL_AGENT_BACKEND", Backend.DIRECT_API.value)))
+app = make_app(legal_agent)
+
+def main():
+    """Run the API under uvicorn"""
+    port = int(os.getenv("PORT", 8000))
+    logger.info("Starting Claude Legal Agent API v3.0 on port %s (backend=%s)", port, legal_agent.backend.value)
+
+    if legal_agent.available:
+        logger.info("Claude configured - ready for legal analysis")
+    else:
+        logger.warning("Setup required - %s", legal_agent.setup_hint)
+
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", str(DEFAULT_WORKERS))))
+    # Spawned workers re-import this module and split the rate limits by it
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    if workers > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Spawned workers inherit this and write their metrics where /metrics can merge them
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="legal_agent_metrics_")
+
+    # Workers are spawned processes, so uvicorn needs the app as an import string
+    uvicorn.run(
+        "legal_agent.app:app",
+        app_dir=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        host="0.0.0.0",
+        port=port,
+        workers=workers,
+        # uvloop and httptools when installed - uvloop has no Windows support
+        loop="auto",
+        http="auto",
+        log_level="info",
+        access_log=False
+    )
+
+if __name__ == "__main__":
+    main()
@@ -3,148 +3,281 @@
 Test client for Claude Legal Agent API
 """
 
-import requests
-import json
-from typing import Dict, Any
+import asyncio
+import io
+import sys
+import time
+from typing import Awaitable, Callable, Dict, Any, List, Optional, TextIO, Tuple, TypeVar, Union
+
+import httpx
+import orjson
+from cachetools import TTLCache
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+
+HEALTH_PATH = "/health"
+QUERY_PATH = "/legal/query"
+REVIEW_PATH = "/legal/contract-review"
+RISK_PATH = "/legal/risk-assessment"
+BATCH_PATH = "/legal/batch"
+
+# Set to e.g. "https://your-app-name.onrender.com" to also test production
+PRODUCTION_URL: Optional[str] = None
+
+T = TypeVar("T")
+
+# Cache keys are (path, *request fields)
+CacheKey = Tuple[Any, ...]
+ResponseCache = TTLCache[CacheKey, Dict[str, Any]]
+ReportFn = Callable[[Dict[str, Any], TextIO], None]
+
+# Client-side cache lifetimes, in seconds
+HEALTH_CACHE_TTL = 5
+QUERY_CACHE_TTL = 300
+
+DEFAULT_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+# Production checks must not hang on a stuck or cold-starting deployment
+PRODUCTION_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+PREWARM_TIMEOUT = httpx.Timeout(2.0)
+
+# Gateway errors Render returns while a deployment restarts or cold-starts
+TRANSIENT_STATUS_CODES = {502, 503, 504}
+
+def is_transient(error: BaseException) -> bool:
+    """Connection failures, timeouts and gateway errors - never 4xx or app errors"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in TRANSIENT_STATUS_CODES
+    return isinstance(error, (httpx.NetworkError, httpx.TimeoutException))
+
+def read_json(response: httpx.Response) -> Dict[str, Any]:
+    """Decode a response body with orjson instead of the stdlib json module"""
+    result: Dict[str, Any] = orjson.loads(response.content)
+    return result
 
 class LegalAgentClient:
-    def __init__(self, base_url: str = "http://localhost:8000"):
-        self.base_url = base_url
-    
-    def health_check(self) -> Dict[str, Any]:
+    # Fixed attribute layout - no per-instance __dict__
+    __slots__ = ("base_url", "timeout", "_client", "_health_cache", "_query_cache")
+
+    def __init__(self, base_url: str = "http://localhost:8000", timeout: httpx.Timeout = DEFAULT_TIMEOUT):
+        self.base_url: str = base_url
+        self.timeout: httpx.Timeout = timeout
+        # Created on first use, and again if used after aclose()
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # Successful responses, so repeat health checks and identical queries skip the network
+        self._health_cache: ResponseCache = TTLCache(maxsize=1, ttl=HEALTH_CACHE_TTL)
+        self._query_cache: ResponseCache = TTLCache(maxsize=256, ttl=QUERY_CACHE_TTL)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared HTTP/2 client - concurrent calls multiplex over one pooled connection"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=True,
+                headers={"Content-Type": "application/json"},
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=8, max_keepalive_connections=4)
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the shared client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def connect(self) -> None:
+        """Resolve DNS and open a pooled connection before the first timed request"""
+        try:
+            await self.client.get(HEALTH_PATH, timeout=PREWARM_TIMEOUT)
+        except httpx.HTTPError:
+            # Best effort - the real requests report any connection problem
+            pass
+
+    async def __aenter__(self) -> "LegalAgentClient":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential_jitter(multiplier=0.3, max=3.0, jitter=0.3),
+        retry=retry_if_exception(is_transient),
+        reraise=True
+    )
+    async def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        """Send one request, retrying transient failures with exponential backoff and jitter"""
+        content = orjson.dumps(payload) if payload is not None else None
+        response = await self.client.request(method, path, content=content)
+        if response.status_code in TRANSIENT_STATUS_CODES:
+            response.raise_for_status()
+        return response
+
+    @staticmethod
+    async def _cached(
+        cache: ResponseCache,
+        key: CacheKey,
+        fetch: Callable[[], Awaitable[Tuple[int, Dict[str, Any]]]],
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """Return a cached response for key, else fetch it and cache it if successful"""
+        if use_cache and key in cache:
+            return cache[key]
+        status, result = await fetch()
+        if use_cache and status < 400:
+            cache[key] = result
+        return result
+
+    async def health_check(self, no_cache: bool = False) -> Dict[str, Any]:
         """Test health endpoint"""
-        response = requests.get(f"{self.base_url}/health")
-        return response.json()
-    
-    def query_legal_analysis(self, query: str, context: str = None, max_turns: int = 2) -> Dict[str, Any]:
+        async def fetch() -> Tuple[int, Dict[str, Any]]:
+            response = await self._request("GET", HEALTH_PATH)
+            return response.status_code, read_json(response)
+
+        return await self._cached(self._health_cache, (HEALTH_PATH,), fetch, not no_cache)
+
+    async def _post_query(
+        self, path: str, query: str, context: Optional[str], max_turns: int, no_cache: bool
+    ) -> Dict[str, Any]:
+        """POST a legal query to path, through the query cache"""
+        async def fetch() -> Tuple[int, Dict[str, Any]]:
+            payload = {"query": query, "context": context, "max_turns": max_turns}
+            response = await self._request("POST", path, payload)
+            return response.status_code, read_json(response)
+
+        key = (path, query, context, max_turns)
+        return await self._cached(self._query_cache, key, fetch, not no_cache and max_turns != 0)
+
+    async def query_legal_analysis(
+        self, query: str, context: Optional[str] = None, max_turns: int = 2, no_cache: bool = False
+    ) -> Dict[str, Any]:
         """Send legal query and get analysis"""
-        payload = {
-            "query": query,
-            "context": context,
-            "max_turns": max_turns
-        }
-        
-        response = requests.post(
-            f"{self.base_url}/legal/query",
-            json=payload,
-            headers={"Content-Type": "application/json"}
-        )
-        
-        return response.json()
-    
-    def contract_review(self, contract_clause: str, context: str = None) -> Dict[str, Any]:
+        return await self._post_query(QUERY_PATH, query, context, max_turns, no_cache)
+
+    async def contract_review(self, contract_clause: str, context: Optional[str] = None, no_cache: bool = False) -> Dict[str, Any]:
         """Specialized contract review"""
-        payload = {
-            "query": contract_clause,
-            "context": context,
-            "max_turns": 3
-        }
-        
-        response = requests.post(
-            f"{self.base_url}/legal/contract-review",
-            json=payload
-        )
-        
-        return response.json()
-    
-    def risk_assessment(self, risk_query: str, context: str = None) -> Dict[str, Any]:
+        return await self._post_query(REVIEW_PATH, contract_clause, context, 3, no_cache)
+
+    async def risk_assessment(self, risk_query: str, context: Optional[str] = None, no_cache: bool = False) -> Dict[str, Any]:
         """Legal risk assessment"""
-        payload = {
-            "query": risk_query,
-            "context": context,
-            "max_turns": 2
-        }
-        
-        response = requests.post(
-            f"{self.base_url}/legal/risk-assessment",
-            json=payload
-        )
-        
-        return response.json()
+        return await self._post_query(RISK_PATH, risk_query, context, 2, no_cache)
 
-def run_tests():
-    """Run comprehensive API tests"""
-    client = LegalAgentClient()
-    
-    print("Testing Claude Legal Agent API")
-    print("=" * 50)
-    
-    # Test 1: Health Check
-    print("\n1. Health Check:")
-    try:
-        health = client.health_check()
-        print(f"Health: {health['status']}")
-        print(f"   Claude SDK: {health['claude_sdk']}")
-        print(f"   OAuth Mode: {health['oauth_mode']}")
-    except Exception as e:
-        print(f"Health check failed: {e}")
-    
-    # Test 2: Basic Legal Query
-    print("\n2. Basic Legal Query:")
-    try:
-        result = client.query_legal_analysis(
-            query="What are the legal implications of unlimited liability clauses?",
-            context="Software licensing agreement"
-        )
-        print(f"Query ID: {result.get('query_id', 'N/A')}")
-        print(f"   Status: {result.get('status', 'N/A')}")
-        print(f"   Processing Time: {result.get('processing_time', 0):.2f}s")
-        if 'response' in result:
-            print(f"   Response Preview: {result['response'][:200]}...")
-    except Exception as e:
-        print(f"Legal query failed: {e}")
-    
-    # Test 3: Contract Review
-    print("\n3. Contract Review:")
-    try:
-        result = client.contract_review(
-            contract_clause="The licensee agrees to unlimited liability for any damages arising from use of the software, including indirect, consequential, and punitive damages.",
-            context="SaaS licensing agreement"
-        )
-        print(f"Query ID: {result.get('query_id', 'N/A')}")
-        print(f"   Status: {result.get('status', 'N/A')}")
-        if 'response' in result:
-            print(f"   Response Preview: {result['response'][:200]}...")
-    except Exception as e:
-        print(f"Contract review failed: {e}")
-    
-    # Test 4: Risk Assessment
-    print("\n4. Risk Assessment:")
+    async def batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run several endpoint calls in one /legal/batch round-trip; results keep item order"""
+        response = await self._request("POST", BATCH_PATH, {"items": items})
+        result = read_json(response)
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}: {result.get('detail')}")
+        results: List[Dict[str, Any]] = result["results"]
+        return results
+
+def print_health(health: Dict[str, Any], out: TextIO) -> None:
+    print(f"Health: {health['status']}", file=out)
+    print(f"   Backend: {health['backend']}", file=out)
+    print(f"   Claude Configured: {health['claude_configured']}", file=out)
+
+def print_analysis(result: Dict[str, Any], out: TextIO) -> None:
+    print(f"Query ID: {result.get('query_id', 'N/A')}", file=out)
+    print(f"   Status: {result.get('status', 'N/A')}", file=out)
+    print(f"   Processing Time: {result.get('processing_time', 0):.2f}s", file=out)
+    if 'response' in result:
+        print(f"   Response Preview: {result['response'][:200]}...", file=out)
+
+def flush_section(out: io.StringIO) -> None:
+    """Write a buffered report section to stdout in a single write"""
+    sys.stdout.write(out.getvalue())
+    sys.stdout.flush()
+
+async def timed(name: str, call: Awaitable[T]) -> Tuple[str, Union[T, Exception], float]:
+    """Await call, returning its result (or exception) and wall-clock latency"""
+    start = time.perf_counter()
+    result: Union[T, Exception]
     try:
-        result = client.risk_assessment(
-            risk_query="Evaluate the risks of operating a SaaS business without terms of service",
-            context="Startup business planning"
-        )
-        print(f"Query ID: {result.get('query_id', 'N/A')}")
-        print(f"   Status: {result.get('status', 'N/A')}")
-        if 'response' in result:
-            print(f"   Response Preview: {result['response'][:200]}...")
+        result = await call
     except Exception as e:
-        print(f"Risk assessment failed: {e}")
+        result = e
+    return name, result, time.perf_counter() - start
 
-def test_production_url(url: str):
+async def run_tests(client: LegalAgentClient) -> None:
+    """Run comprehensive API tests"""
+    out = io.StringIO()
+    print("Testing Claude Legal Agent API", file=out)
+    print("=" * 50, file=out)
+    flush_section(out)
+
+    tests: List[Tuple[str, ReportFn, Dict[str, Any]]] = [
+        ("1. Health Check", print_health, {"endpoint": "health"}),
+        ("2. Basic Legal Query", print_analysis, {
+            "endpoint": "query",
+            "query": "What are the legal implications of unlimited liability clauses?",
+            "context": "Software licensing agreement"
+        }),
+        ("3. Contract Review", print_analysis, {
+            "endpoint": "contract-review",
+            "query": "The licensee agrees to unlimited liability for any damages arising from use of the software, including indirect, consequential, and punitive damages.",
+            "context": "SaaS licensing agreement",
+            "max_turns": 3
+        }),
+        ("4. Risk Assessment", print_analysis, {
+            "endpoint": "risk-assessment",
+            "query": "Evaluate the risks of operating a SaaS business without terms of service",
+            "context": "Startup business planning",
+            "max_turns": 2
+        }),
+    ]
+
+    # The tests are independent - send them as one batch, run concurrently server-side
+    _, results, latency = await timed("batch", client.batch([item for _, _, item in tests]))
+    out = io.StringIO()
+    print(f"\nBatch round-trip: {latency:.2f}s", file=out)
+    flush_section(out)
+
+    for index, (name, report, _) in enumerate(tests):
+        out = io.StringIO()
+        print(f"\n{name}:", file=out)
+        try:
+            if isinstance(results, Exception):
+                raise results
+            result = results[index]
+            if "detail" in result:
+                raise RuntimeError(f"HTTP {result['status_code']}: {result['detail']}")
+            report(result, out)
+        except Exception as e:
+            print(f"{name} failed: {e}", file=out)
+        flush_section(out)
+
+async def test_production_url(client: LegalAgentClient) -> None:
     """Test against production URL"""
-    print(f"\nTesting Production URL: {url}")
-    client = LegalAgentClient(base_url=url)
-    
+    out = io.StringIO()
+    print(f"\nTesting Production URL: {client.base_url}", file=out)
+
     try:
-        health = client.health_check()
-        print(f"Production Health: {health['status']}")
-        
-        # Quick test query
-        result = client.query_legal_analysis(
-            query="What is a force majeure clause?",
-            max_turns=1
+        # Health and a quick test query, concurrently
+        health, result = await asyncio.gather(
+            client.health_check(),
+            client.query_legal_analysis(
+                query="What is a force majeure clause?",
+                max_turns=1
+            )
         )
-        print(f"Production Query: {result.get('status', 'N/A')}")
-        print(f"   Processing Time: {result.get('processing_time', 0):.2f}s")
-        
+        print(f"Production Health: {health['status']}", file=out)
+        print(f"Production Query: {result.get('status', 'N/A')}", file=out)
+        print(f"   Processing Time: {result.get('processing_time', 0):.2f}s", file=out)
+
     except Exception as e:
-        print(f"Production test failed: {e}")
+        print(f"Production test failed: {e}", file=out)
+    flush_section(out)
+
+async def main() -> None:
+    """Run the local tests, and the production checks alongside them when PRODUCTION_URL is set"""
+    async with LegalAgentClient() as local:
+        if not PRODUCTION_URL:
+            await run_tests(local)
+            return
+        async with LegalAgentClient(base_url=PRODUCTION_URL, timeout=PRODUCTION_TIMEOUT) as production:
+            await asyncio.gather(run_tests(local), test_production_url(production))
 
 if __name__ == "__main__":
-    # Run local tests
-    run_tests()
-    
-    # Uncomment to test production URL
-    # test_production_url("https://your-app-name.onrender.com")
\ No newline at end of file
+    asyncio.run(main())